@@ -1,11 +1,32 @@
 # main.py
-import pandas as pd
+from __future__ import annotations
+
+import anyio
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, date
-from fastapi import FastAPI, HTTPException
+from functools import lru_cache
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
+from pydantic import BaseModel
+import gzip
+import hashlib
+import logging
 import os
-import moment
+import orjson
+import pickle
+import tempfile
+import threading
+from typing import TYPE_CHECKING
+
+# pandas, numpy y openpyxl solo se necesitan para parsear el Excel, así que se importan
+# dentro de las funciones que lo hacen. Si los turnos salen de la caché en disco, el
+# servidor arranca sin cargarlos (se ahorran varios cientos de ms en cada arranque).
+if TYPE_CHECKING:
+    import pandas as pd
 
 # --- Mapeo de Horarios por Tipo de Turno y Día de la Semana ---
 HORARIOS_POR_TURNO = {
@@ -38,16 +59,53 @@ HORARIOS_POR_TURNO = {
     }
 }
 
+# Tabla plana (tipo_dia, tipo_turno) -> horario, construida una sola vez al importar.
+# Evita la doble búsqueda HORARIOS_POR_TURNO[tipo_dia][tipo_turno] por cada celda.
+HORARIO_FLAT = {
+    (tipo_dia, tipo_turno): horario
+    for tipo_dia, horarios in HORARIOS_POR_TURNO.items()
+    for tipo_turno, horario in horarios.items()
+}
+
+logger = logging.getLogger(__name__)
+
 # Cargar variables de entorno del archivo .env
 load_dotenv()
 
+# uvicorn solo configura sus propios loggers: sin esto, los mensajes INFO de este módulo
+# (resumen de carga, dispositivos registrados) se perderían
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:     %(name)s - %(message)s")
+
 # --- Configuración ---
 EXCEL_FILE_PATH = os.getenv("EXCEL_FILE_PATH", "turnoRaiz.xlsx")
+# Archivo donde se persisten los turnos ya parseados entre reinicios del servidor
+CACHE_FILE_PATH = os.getenv("TURNOS_CACHE_PATH", "turnos_cache.pkl")
+# Versión de la caché en disco: súbela ante CUALQUIER cambio en lo que produce la carga
+# (parser de fechas, limpieza de columnas, formato del JSON/gzip/ETag o de lo que se guarda),
+# porque la caché solo se invalida sola cuando cambia el Excel.
+CACHE_VERSION = 4
+# Cada cuántos segundos se revisa en segundo plano si el Excel cambió
+REFRESH_INTERVAL = int(os.getenv("TURNOS_REFRESH_SECONDS", "60"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los endpoints síncronos (def) se ejecutan en el threadpool de anyio; lo agrandamos
+    # para que varias cargas/lecturas concurrentes no se encolen con el límite por defecto (40).
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 64
+
+    # Cargamos los turnos al arrancar y los mantenemos al día en segundo plano,
+    # así ninguna request tiene que esperar a que se parsee el Excel
+    await precargar_turnos()
+    tarea_refresco = asyncio.create_task(refrescar_turnos_periodicamente())
+    yield
+    tarea_refresco.cancel()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="API de Turnos",
     description="Una API para gestionar y consultar turnos de trabajo desde un archivo Excel.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # --- Lista de Nombres de Personas ---
@@ -55,127 +113,307 @@ app = FastAPI(
 # con los encabezados de tus columnas en el Excel.
 NOMBRES_PERSONAS = ['J. VIDAL', 'M. PAEZ', 'L.DOMINGUEZ', 'J.VASQUEZ', 'J.CANALES', 'L. FERNANDEZ', 'N. SANTANDER', 'P. PEÑA', 'L. MOLINA', 'N. CARREÑO']
 
+# Columnas que realmente usamos del Excel; el resto ni se parsea.
+# 'MES_NUMERO' es opcional: si no existe en el Excel simplemente no se lee.
+COLUMNAS_USADAS = {'FECHA', 'AÑO', 'MES_NUMERO', *NOMBRES_PERSONAS}
+# Las columnas de personas son siempre códigos de turno: las leemos directamente como texto
+# para que pandas no tenga que inferir el tipo. 'FECHA' y 'AÑO' se dejan sin tipo porque
+# pueden venir como fecha/número nativo o con celdas basura que se descartan más adelante.
+DTYPES_EXCEL = {persona: str for persona in NOMBRES_PERSONAS}
+
 # --- Configuración CORS ---
-origins = [
-    "http://localhost",
-    "http://localhost:8080",
-    "http://localhost:19000",
-    "http://localhost:19001",
-    # Asegúrate de que esta IP sea la de tu máquina donde corres el backend
-    # Por ejemplo, "http://192.168.1.XX:8000" o "http://192.168.91.252:8000"
-    "http://192.168.91.252:8000", # <-- AJUSTA ESTA IP SI ES NECESARIO
-    "http://192.168.150.252:8000", # <-- AJUSTA ESTA IP SI ES NECESARIO
-    "https://calendario-turnos-backend.onrender.com" # Tu URL de Render.com
-]
+# Orígenes permitidos como una sola expresión regular (Starlette la compila una vez):
+# - localhost / 127.0.0.1 en cualquier puerto (Expo web, pruebas locales)
+# - cualquier IP de la red local 192.168.x.x, así no hay que ajustar la IP de tu máquina a mano
+# - tu URL de Render.com
+ORIGINS_REGEX = (
+    r"^(https?://(localhost|127\.0\.0\.1|192\.168\.\d{1,3}\.\d{1,3})(:\d+)?"
+    r"|https://calendario-turnos-backend\.onrender\.com)$"
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"], # Para desarrollo, "*" es conveniente. En producción, usa 'origins'
+    allow_origin_regex=ORIGINS_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    max_age=86400, # El navegador cachea el preflight (OPTIONS) durante 24 horas
 )
 
+# Comprime las respuestas grandes; /turnos ya sale comprimido desde la caché
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Tipo de día indexado por weekday(): Lunes (0) a Domingo (6)
+_TIPO_DIA = ("Lunes a Viernes",) * 5 + ("Sábado", "Domingos y Festivos")
+
 # Función auxiliar para determinar el tipo de día
 def get_tipo_dia(fecha: date):
-    if fecha.weekday() == 5: # Sábado es 5
-        return "Sábado"
-    elif fecha.weekday() == 6: # Domingo es 6
-        return "Domingos y Festivos"
-    else: # Lunes a Viernes (0 a 4)
-        return "Lunes a Viernes"
+    return _TIPO_DIA[fecha.weekday()]
+
+# Misma tabla como array de numpy, para indexarla con un array de weekdays.
+# Se construye una sola vez, en la primera carga del Excel (numpy no se importa antes).
+@lru_cache(maxsize=1)
+def _tipo_dia_array():
+    import numpy as np
+
+    return np.array(_TIPO_DIA, dtype=object)
+
+# Dict {"tipo_turno", "horario"} de cada celda. Solo hay unas pocas combinaciones distintas,
+# así que todas las celdas iguales comparten el mismo dict (no se debe modificar).
+@lru_cache(maxsize=1024)
+def _hoja_turno(tipo_dia: str, tipo_turno: str) -> dict:
+    return {
+        "tipo_turno": tipo_turno,
+        "horario": HORARIO_FLAT.get((tipo_dia, tipo_turno), "Horario no disponible")
+    }
+
+# Función auxiliar para leer la primera hoja del Excel como DataFrame
+# Usa calamine si está instalado; si no, abre el libro con openpyxl en modo solo lectura,
+# que es mucho más rápido y liviano que el wrapper de pandas sobre openpyxl.
+def leer_excel(archivo_path: str) -> pd.DataFrame:
+    import pandas as pd
+
+    try:
+        return pd.read_excel(archivo_path, engine="calamine", usecols=lambda c: c in COLUMNAS_USADAS,
+                             dtype=DTYPES_EXCEL)
+    except ImportError:
+        logger.warning("python-calamine no está instalado. Usando openpyxl en modo solo lectura.")
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(archivo_path, read_only=True, data_only=True)
+    try:
+        filas = wb.active.iter_rows(values_only=True)
+        encabezado = next(filas)
+        indices = [i for i, columna in enumerate(encabezado) if columna in COLUMNAS_USADAS]
+        # dtype=object: sin inferencia, así un código numérico con celdas vacías en la columna
+        # sigue siendo 4 (y no 4.0), igual que lo entrega calamine
+        return pd.DataFrame([[fila[i] for i in indices] for fila in filas],
+                            columns=[encabezado[i] for i in indices], dtype=object)
+    finally:
+        wb.close()
+
+# Función auxiliar para construir la columna de fechas de todo el DataFrame
+# Devuelve una Serie de datetime64 con NaT en las filas que no se pudieron parsear.
+def construir_columna_fecha(df: pd.DataFrame) -> pd.Series:
+    import pandas as pd
+
+    fecha_col = df['FECHA']
+    # Columna entera de fechas nativas: no hay nada que parsear
+    if pd.api.types.is_datetime64_any_dtype(fecha_col):
+        return fecha_col.dt.normalize()
+
+    anio = pd.to_numeric(df['AÑO'], errors='coerce')
+
+    # 1. Celdas que ya vienen como fecha de Pandas/Python nativa desde el Excel
+    # (solo las buscamos celda a celda si la columna mezcla tipos)
+    if pd.api.types.is_string_dtype(fecha_col):
+        es_nativa = pd.Series(False, index=fecha_col.index)
+    else:
+        es_nativa = fecha_col.map(lambda v: isinstance(v, date))
+    fechas_nativas = pd.to_datetime(fecha_col.where(es_nativa), errors='coerce')
+
+    # 2. Formatos "DD/MM, dia_semana_abreviado" y "DD/MM/YYYY"
+    dia_mes = fecha_col.astype(str).str.split(',', n=1).str[0].str.strip() # "18/12"
+    partes = dia_mes.str.split('/', expand=True).reindex(columns=range(3))
+    dia = pd.to_numeric(partes[0], errors='coerce')
+    mes = pd.to_numeric(partes[1], errors='coerce')
+    anio = pd.to_numeric(partes[2], errors='coerce').fillna(anio)
+
+    # 3. Solo el día numérico: el mes sale de 'MES_NUMERO' o, si no hay, del mes actual
+    if 'MES_NUMERO' in df.columns:
+        mes = mes.fillna(pd.to_numeric(df['MES_NUMERO'], errors='coerce'))
+    mes = mes.fillna(datetime.now().month)
+
+    fechas_texto = pd.to_datetime({'year': anio, 'month': mes, 'day': dia}, errors='coerce')
+    fechas = fechas_nativas.where(es_nativa, fechas_texto)
+
+    # 4. Cualquier otra fecha completa con año de 4 dígitos ("05-06-2024", "2024-06-05", ...)
+    # se la dejamos a pd.to_datetime: día primero, salvo que el texto empiece por el año (ISO).
+    # Solo filas donde el paso 2 no encontró día: las fechas con '/' inválidas se siguen saltando.
+    texto = fecha_col.astype(str).str.strip()
+    pendientes = fechas.isna() & dia.isna() & texto.str.contains(r'\d{4}')
+    if pendientes.any():
+        empieza_por_anio = texto.str.match(r'\d{4}')
+        for mascara, dayfirst in ((pendientes & empieza_por_anio, False), (pendientes & ~empieza_por_anio, True)):
+            fechas[mascara] = pd.to_datetime(texto[mascara], errors='coerce', format='mixed', dayfirst=dayfirst)
+    return fechas
 
 # --- Función para cargar turnos desde el archivo Excel (MODIFICADA) ---
 def cargar_turnos_desde_excel_full(archivo_path: str) -> dict:
+    import numpy as np
+
     try:
-        print(f"Intentando cargar Excel desde: {archivo_path}")
-        df = pd.read_excel(archivo_path)
+        logger.debug("Intentando cargar Excel desde: %s", archivo_path)
+        df = leer_excel(archivo_path)
     except FileNotFoundError:
-        print(f"Error: Archivo Excel no encontrado en {archivo_path}")
+        logger.error("Archivo Excel no encontrado en %s", archivo_path)
         raise HTTPException(status_code=404, detail="Archivo Excel de turnos no encontrado.")
     except Exception as e:
-        print(f"Error al leer el archivo Excel: {e}")
+        logger.error("Error al leer el archivo Excel: %s", e)
         raise HTTPException(status_code=500, detail=f"Error al procesar el archivo Excel: {e}")
 
-    turnos_data_completa = {}
-    
     if 'FECHA' not in df.columns:
         raise HTTPException(status_code=500, detail="Columna 'FECHA' no encontrada en el Excel.")
     
     # Si 'AÑO' no está o está vacía, intentamos inferirla del año actual o de la columna 'FECHA'
     if 'AÑO' not in df.columns or df['AÑO'].isnull().all():
-        print("Advertencia: Columna 'AÑO' no encontrada o vacía. Intentando inferir el año del mes actual.")
+        logger.warning("Columna 'AÑO' no encontrada o vacía. Usando el año actual.")
         anio_defecto = datetime.now().year # Usamos el año actual como fallback
-        df['AÑO'] = df['AÑO'].fillna(anio_defecto)
-
-    for index, row in df.iterrows():
-        try:
-            fecha_bruta = str(row['FECHA']).strip() # Asegúrate de que siempre sea un string y quita espacios
-            anio = int(row['AÑO'])
-
-            fecha_obj = None
-
-            # 1. Intentar parsear como fecha de Pandas/Python nativa (si ya viene bien del Excel)
-            if isinstance(row['FECHA'], (pd.Timestamp, datetime, date)):
-                fecha_obj = row['FECHA'].date()
-
-            # 2. Intentar parsear el formato "DD/MM, dia_semana_abreviado"
-            elif ',' in fecha_bruta and '/' in fecha_bruta:
-                try:
-                    # Extraer "DD/MM" y el "dia_semana_abreviado"
-                    partes_fecha = fecha_bruta.split(',')[0].strip() # "18/12"
-                    dia_str, mes_str = partes_fecha.split('/')
-                    dia = int(dia_str)
-                    mes = int(mes_str)
-                    fecha_obj = date(anio, mes, dia)
-                except ValueError:
-                    print(f"Advertencia: No se pudo parsear 'DD/MM' de '{fecha_bruta}'.")
-            
-            # 3. Intentar parsear el formato "DD/MM/YYYY" si es posible
-            elif '/' in fecha_bruta and len(fecha_bruta.split('/')) == 3:
-                try:
-                    fecha_obj = datetime.strptime(fecha_bruta, "%d/%m/%Y").date()
-                except ValueError:
-                    print(f"Advertencia: No se pudo parsear como 'DD/MM/YYYY': '{fecha_bruta}'.")
-
-            # 4. Intentar parsear como solo día si 'MES_NUMERO' está disponible
-            elif isinstance(fecha_bruta, (int, float)): # Si el valor es solo el día numérico
-                dia = int(fecha_bruta)
-                mes = datetime.now().month # Valor por defecto, si no hay 'MES_NUMERO'
-                if "MES_NUMERO" in df.columns and pd.notna(row["MES_NUMERO"]):
-                    mes = int(row["MES_NUMERO"])
-                fecha_obj = date(anio, mes, dia)
-
-            if fecha_obj is None:
-                print(f"Error: No se pudo parsear la fecha '{fecha_bruta}' en la fila {index}. Saltando.")
-                continue # Saltar esta fila si la fecha no pudo ser parseada
-
-            fecha_str = fecha_obj.strftime("%Y-%m-%d")
-            
-            turnos_del_dia = {}
-            for persona in NOMBRES_PERSONAS:
-                tipo_turno_raw = row.get(persona, '')
-                tipo_turno = str(tipo_turno_raw).strip() if pd.notna(tipo_turno_raw) else ''
-                
-                tipo_dia = get_tipo_dia(fecha_obj)
-                horario = HORARIOS_POR_TURNO.get(tipo_dia, {}).get(tipo_turno, "Horario no disponible")
-
-                turnos_del_dia[persona] = {
-                    "tipo_turno": tipo_turno,
-                    "horario": horario
-                }
-            turnos_data_completa[fecha_str] = turnos_del_dia
-
-        except Exception as e:
-            print(f"Error general procesando fila {index} (Fecha: {row.get('FECHA', 'N/A')}): {e}")
-            continue
-
-    print(f"Cargados {len(turnos_data_completa)} días de turnos para {len(NOMBRES_PERSONAS)} personas.")
+        df['AÑO'] = anio_defecto
+
+    # Descartamos de entrada las filas sin 'FECHA' o 'AÑO' (p. ej. filas vacías al final de la hoja)
+    filas_totales = len(df)
+    df = df.dropna(subset=['FECHA', 'AÑO'], how='any').reset_index(drop=True)
+    if len(df) < filas_totales:
+        logger.debug("%d filas sin 'FECHA' o 'AÑO' descartadas.", filas_totales - len(df))
+
+    # Construimos todas las fechas de una sola vez (vectorizado) y saltamos las inválidas
+    df['Fecha'] = construir_columna_fecha(df)
+    filas_invalidas = df['Fecha'].isna()
+    if filas_invalidas.any():
+        logger.debug("%d filas sin fecha válida. Saltando.", int(filas_invalidas.sum()))
+        df = df[~filas_invalidas]
+
+    # Trabajamos columna a columna con arrays de numpy en vez de fila a fila
+    fechas = df['Fecha']
+    fecha_strs = fechas.dt.strftime("%Y-%m-%d").to_numpy()
+    dias_semana = fechas.dt.weekday.to_numpy()
+    tipos_dia = _tipo_dia_array()[dias_semana]
+
+    # Normalizamos una sola vez la columna de cada persona (sin NaN y sin espacios)
+    tipos_por_persona = {
+        persona: df[persona].fillna('').astype(str).str.strip().to_numpy() if persona in df.columns
+                 else np.full(len(df), '', dtype=object)
+        for persona in NOMBRES_PERSONAS
+    }
+
+    # Resolvemos el horario de cada columna completa con map() sobre la caché de hojas,
+    # sin ejecutar código Python por celda, y luego armamos cada día con dict(zip(...))
+    hojas_por_persona = [list(map(_hoja_turno, tipos_dia, tipos_por_persona[persona]))
+                         for persona in NOMBRES_PERSONAS]
+    turnos_data_completa = {
+        fecha_str: dict(zip(NOMBRES_PERSONAS, hojas_del_dia))
+        for fecha_str, hojas_del_dia in zip(fecha_strs, zip(*hojas_por_persona))
+    }
+
+    logger.info("Cargados %d días de turnos para %d personas (%d filas saltadas).",
+                len(turnos_data_completa), len(NOMBRES_PERSONAS), filas_totales - len(df))
     return turnos_data_completa
 
-# Cargar los turnos al iniciar la aplicación FastAPI
-# Se hace una carga inicial global para que los endpoints puedan acceder a ella
-turnos_completos = cargar_turnos_desde_excel_full(EXCEL_FILE_PATH)
+# --- Caché en disco ---
+# Guardamos el resultado junto a una "firma" del Excel (ruta, mtime, tamaño) y de la
+# configuración usada para construirlo. Si al reiniciar la firma coincide, cargamos el
+# pickle en vez de volver a parsear el Excel.
+def leer_cache_disco(firma: tuple):
+    try:
+        with open(CACHE_FILE_PATH, "rb") as f:
+            firma_guardada, datos = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("No se pudo leer la caché en disco %s: %s", CACHE_FILE_PATH, e)
+        return None
+    return datos if firma_guardada == firma else None
+
+def guardar_cache_disco(firma: tuple, datos) -> None:
+    # La caché en disco es opcional: cualquier fallo al guardarla se registra y se ignora
+    tmp_path = None
+    try:
+        # Escribimos a un archivo temporal y lo renombramos para que nunca quede a medias
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(CACHE_FILE_PATH)))
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((firma, datos), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CACHE_FILE_PATH)
+    except Exception as e:
+        logger.warning("No se pudo guardar la caché en disco %s: %s", CACHE_FILE_PATH, e)
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+# Carga los turnos para la firma (ruta, mtime en ns, tamaño) del Excel: desde la caché en
+# disco si coincide, o parseando el Excel. Usamos st_mtime_ns (entero exacto) para no perder
+# cambios por redondeo del float.
+# Junto al dict devuelve el JSON ya serializado (y su versión gzip) y su ETag, así
+# /turnos no re-serializa ni re-comprime en cada request.
+# Solo la llama obtener_turnos con _carga_lock tomado y cuando _turnos_actuales quedó viejo;
+# ese snapshot es la única caché en memoria.
+def _cargar_datos(archivo_path: str, mtime_ns: int, size: int) -> tuple[dict, bytes, bytes, str]:
+    firma = (CACHE_VERSION, os.path.abspath(archivo_path), mtime_ns, size, NOMBRES_PERSONAS, HORARIOS_POR_TURNO)
+    datos = leer_cache_disco(firma)
+    if datos is not None:
+        return datos
+
+    turnos = cargar_turnos_desde_excel_full(archivo_path)
+    turnos_blob = orjson.dumps(turnos)
+    turnos_etag = hashlib.blake2b(turnos_blob, digest_size=8).hexdigest()
+    datos = (turnos, turnos_blob, gzip.compress(turnos_blob, mtime=0), turnos_etag)
+    guardar_cache_disco(firma, datos)
+    return datos
+
+# Último resultado cargado: ((ruta, mtime_ns, tamaño), (dict, blob, gzip, etag)).
+# Se reemplaza entero de una sola vez, así que se puede leer sin lock.
+_turnos_actuales = None
+_carga_lock = threading.Lock()
+
+def obtener_turnos() -> tuple[dict, bytes, bytes, str]:
+    global _turnos_actuales
+    try:
+        st = os.stat(EXCEL_FILE_PATH)
+    except OSError:
+        logger.error("Archivo Excel no encontrado en %s", EXCEL_FILE_PATH)
+        raise HTTPException(status_code=404, detail="Archivo Excel de turnos no encontrado.")
+    clave = (EXCEL_FILE_PATH, st.st_mtime_ns, st.st_size)
+
+    # Camino rápido: el Excel no cambió desde la última carga, no hace falta el lock
+    actual = _turnos_actuales
+    if actual is not None and actual[0] == clave:
+        return actual[1]
+
+    # Doble chequeo con el lock: si llegan varias requests a la vez con la caché vencida,
+    # solo una parsea el Excel y las demás esperan y reutilizan su resultado
+    with _carga_lock:
+        actual = _turnos_actuales
+        if actual is not None and actual[0] == clave:
+            return actual[1]
+        datos = _cargar_datos(*clave)
+        _turnos_actuales = (clave, datos)
+        return datos
+
+# Lo que sirve /turnos: el último resultado bueno, que mantiene al día el refresco en
+# segundo plano. Es una lectura simple (sin stat ni lock); solo si todavía no hay nada
+# cargado (arranque en frío o el Excel apareció después) se carga en la misma request.
+def turnos_en_memoria() -> tuple[dict, bytes, bytes, str]:
+    actual = _turnos_actuales
+    if actual is None:
+        return obtener_turnos()
+    return actual[1]
+
+# --- Precarga y refresco en segundo plano ---
+async def precargar_turnos():
+    try:
+        await anyio.to_thread.run_sync(obtener_turnos)
+    except Exception as e:
+        logger.warning("No se pudieron precargar los turnos: %s", e)
+
+async def refrescar_turnos_periodicamente():
+    # obtener_turnos solo vuelve a parsear si cambió el mtime o el tamaño del Excel,
+    # y reemplaza de una vez el resultado que leen las requests
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL)
+        await precargar_turnos()
+
+# Función auxiliar para comparar el header If-None-Match con un ETag
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    etags = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+    return "*" in etags or etag in etags
+
+# --- Modelos ---
+class DeviceToken(BaseModel):
+    # Opcional para poder seguir respondiendo 400 (y no 422) cuando falta el token
+    device_token: str | None = None
 
 # --- Rutas de la API ---
 
@@ -184,22 +422,35 @@ async def read_root():
     return {"message": "Bienvenido a la API de Turnos!"}
 
 @app.get("/turnos")
-async def get_all_turnos():
-    global turnos_completos
-         
+def get_all_turnos(request: Request):
+    # Endpoint síncrono: si hay que cargar el Excel (CPU/IO bloqueante), Starlette lo
+    # ejecuta en el threadpool, sin frenar el event loop
+    turnos_completos, turnos_blob, turnos_gzip, turnos_etag = turnos_en_memoria()
     if not turnos_completos:
-        # Intenta recargar si está vacío (útil si el archivo aparece después del inicio)       
-        turnos_completos = cargar_turnos_desde_excel_full(EXCEL_FILE_PATH)
-        if not turnos_completos:
-             raise HTTPException(status_code=404, detail="Turnos no cargados o archivo no encontrado")
-    return turnos_completos
+        raise HTTPException(status_code=404, detail="Turnos no cargados o archivo no encontrado")
+
+    # Servimos directamente el gzip precalculado si el cliente lo acepta.
+    # Cada representación (gzip o no) lleva su propio ETag.
+    acepta_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{turnos_etag}-gzip"' if acepta_gzip else f'"{turnos_etag}"'
+    # (el GZipMiddleware ya agrega "Vary: Accept-Encoding" a la respuesta sin comprimir)
+    headers = {"ETag": etag}
+
+    # Si el cliente ya tiene esta versión, no reenviamos el cuerpo
+    if etag_coincide(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={**headers, "Vary": "Accept-Encoding"})
+
+    if acepta_gzip:
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+        return Response(content=turnos_gzip, media_type="application/json", headers=headers)
+    return Response(content=turnos_blob, media_type="application/json", headers=headers)
 
 @app.post("/register_device")
-async def register_device(request: dict): # <-- Cambiado a dict para recibir JSON
-    device_token = request.get("device_token")
+async def register_device(payload: DeviceToken, background_tasks: BackgroundTasks):
+    device_token = payload.device_token
     if device_token:
-        print(f"Dispositivo registrado con token: {device_token}")
         # Aquí es donde REALMENTE guardarías el token en una base de datos.
-        # Por ahora, solo lo imprimimos.
+        # Por ahora, solo lo registramos en el log, después de enviar la respuesta.
+        background_tasks.add_task(logger.info, "Dispositivo registrado con token: %s", device_token)
         return {"message": "Token de dispositivo registrado exitosamente"}
     raise HTTPException(status_code=400, detail="Falta el token del dispositivo")
\ No newline at end of file